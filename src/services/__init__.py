@@ -6,9 +6,16 @@ Provides device connectivity and location spoofing functionality
 # Import main components for easier access
 from .connection_manager import ConnectionManager, ConnectionType
 from .bluetooth_connector import BluetoothConnector
+from .track_lod import TrackPyramid
+from .tracing import SendTracer
+from .tour_planner import plan_tour, build_trajectory
 
 __all__ = [
     'ConnectionManager',
     'ConnectionType',
-    'BluetoothConnector'
+    'BluetoothConnector',
+    'TrackPyramid',
+    'SendTracer',
+    'plan_tour',
+    'build_trajectory'
 ] 
\ No newline at end of file
@@ -6,12 +6,15 @@ Provides functionality for connecting to iOS devices via Bluetooth
 
 import asyncio
 import logging
+import time
 from typing import Callable, Dict, List, Optional, Any
 
 import bleak
 from bleak import BleakClient, BleakScanner
 from bleak.exc import BleakError
 
+from .tracing import SendTracer
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("bluetooth-connector")
@@ -20,14 +23,25 @@ logger = logging.getLogger("bluetooth-connector")
 LOCATION_SERVICE_UUID = "FFFFFFFF-FFFF-FFFF-FFFF-FFFFFFFFFFFF"  # Placeholder UUID
 LOCATION_CHAR_UUID = "FFFFFFFF-FFFF-FFFF-FFFF-FFFFFFFFFFFF"    # Placeholder UUID
 
+# Seconds to wait for the tracer's writer thread to flush when closing it
+TRACER_CLOSE_TIMEOUT = 1.0
+
 class BluetoothConnector:
     """Manages Bluetooth connections to iOS devices for location spoofing"""
     
-    def __init__(self):
-        """Initialize the Bluetooth connector"""
+    def __init__(self, tracer: Optional[SendTracer] = None):
+        """
+        Initialize the Bluetooth connector
+        
+        Args:
+            tracer: Tracer for the connect/send path; if None the connector creates
+                    its own, running its writer thread only while connected
+        """
         self.client: Optional[BleakClient] = None
         self.connected = False
         self.discovered_devices: Dict[str, Any] = {}
+        self._owns_tracer = tracer is None
+        self.tracer = tracer or SendTracer(start=False)
         
     async def discover_devices(self, timeout: int = 5) -> Dict[str, Any]:
         """
@@ -64,31 +78,44 @@ class BluetoothConnector:
         Returns:
             True if connection successful, False otherwise
         """
+        if self._owns_tracer:
+            self.tracer.start()
+        
+        started = time.perf_counter_ns()
         try:
-            logger.info(f"Connecting to device: {device_address}")
             self.client = BleakClient(device_address)
             await self.client.connect()
             self.connected = self.client.is_connected
             
             if self.connected:
-                logger.info(f"Successfully connected to {device_address}")
-                
-                # Try to discover services
+                # Record the service layout for diagnostics instead of logging it inline
                 services = await self.client.get_services()
-                logger.info(f"Services available: {len(services.services)}")
                 for service in services.services.values():
-                    logger.info(f"Service: {service.uuid}")
-                    for char in service.characteristics:
-                        logger.info(f"  Characteristic: {char.uuid}")
+                    self.tracer.record("service", data=(
+                        service.uuid, [char.uuid for char in service.characteristics]
+                    ), force=True)
+                logger.info(f"Connected to {device_address} "
+                            f"({len(services.services)} services)")
             else:
                 logger.error(f"Failed to connect to {device_address}")
-                
+            
+            self.tracer.record("connect", ok=self.connected,
+                               duration_ns=time.perf_counter_ns() - started,
+                               data=device_address, force=True)
             return self.connected
             
         except BleakError as e:
+            self.tracer.record("connect", ok=False,
+                               duration_ns=time.perf_counter_ns() - started,
+                               data=(device_address, str(e)))
             logger.error(f"Error connecting to device: {e}")
             self.connected = False
             return False
+            
+        finally:
+            # Also covers errors other than BleakError (timeouts, OSError, ...)
+            if not self.connected:
+                await self._close_owned_tracer()
     
     async def disconnect(self) -> bool:
         """
@@ -102,8 +129,15 @@ class BluetoothConnector:
             self.connected = False
             logger.info("Device disconnected")
         
+        await self._close_owned_tracer()
         return not self.connected
     
+    async def _close_owned_tracer(self):
+        """Flush and stop the tracer's writer thread if this connector created it"""
+        if self._owns_tracer:
+            # Joining the writer blocks, so keep it off the event loop
+            await asyncio.to_thread(self.tracer.close, TRACER_CLOSE_TIMEOUT)
+    
     async def send_location(self, latitude: float, longitude: float) -> bool:
         """
         Send location data to the connected device
@@ -119,6 +153,7 @@ class BluetoothConnector:
             logger.error("Not connected to any device")
             return False
         
+        started = time.perf_counter_ns()
         try:
             # Format location data
             location_data = f"{latitude},{longitude}".encode('utf-8')
@@ -128,10 +163,14 @@ class BluetoothConnector:
             # would need to be determined through research or reverse engineering
             await self.client.write_gatt_char(LOCATION_CHAR_UUID, location_data)
             
-            logger.info(f"Location sent: {latitude}, {longitude}")
+            self.tracer.record("send", duration_ns=time.perf_counter_ns() - started,
+                               data=(latitude, longitude))
             return True
             
         except BleakError as e:
+            self.tracer.record("send", ok=False,
+                               duration_ns=time.perf_counter_ns() - started,
+                               data=(latitude, longitude, str(e)))
             logger.error(f"Error sending location: {e}")
             return False
 
@@ -139,22 +178,27 @@ async def test_bluetooth():
     """Test the Bluetooth functionality"""
     connector = BluetoothConnector()
     
-    # Discover devices
-    devices = await connector.discover_devices()
-    if not devices:
-        logger.warning("No Bluetooth devices found")
-        return
-    
-    # Connect to the first discovered device (for testing)
-    first_device = list(devices.keys())[0]
-    connected = await connector.connect(first_device)
-    
-    if connected:
-        # Test sending a location (San Francisco coordinates)
-        await connector.send_location(37.7749, -122.4194)
+    try:
+        # Discover devices
+        devices = await connector.discover_devices()
+        if not devices:
+            logger.warning("No Bluetooth devices found")
+            return
+        
+        # Connect to the first discovered device (for testing)
+        first_device = list(devices.keys())[0]
+        connected = await connector.connect(first_device)
         
-        # Disconnect
-        await connector.disconnect()
+        if connected:
+            # Test sending a location (San Francisco coordinates)
+            await connector.send_location(37.7749, -122.4194)
+            
+            # Disconnect
+            await connector.disconnect()
+    finally:
+        connector.tracer.close()
+        for event in connector.tracer.dump():
+            logger.info(f"Trace: {event}")
     
 if __name__ == "__main__":
     # Run the test function if this script is executed directly
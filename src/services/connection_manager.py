@@ -191,6 +191,18 @@ class ConnectionManager:
             "connection_type": self.current_connection_type.value,
             "device_info": self.device_info
         }
+    
+    def dump_trace(self, path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Dump the buffered connect/send trace events
+        
+        Args:
+            path: Optional file to write the events to as JSON lines
+            
+        Returns:
+            List of trace event dictionaries, oldest first
+        """
+        return self.bluetooth_connector.tracer.dump(path)
 
 async def test_connection_manager():
     """Test the connection manager functionality"""
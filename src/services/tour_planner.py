@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Tour planner for the Location Spoofer
+Orders multi-stop tours to minimise travel distance and turns them into
+timed trajectories for playback
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("tour-planner")
+
+EARTH_RADIUS_M = 6371008.8
+MAX_SEGMENT_MOVE = 3  # Longest run of stops moved at once by or-opt
+DEADLINE_CHECK_EVERY = 16  # Improvement steps between time budget checks
+SYMMETRY_SAMPLE_ROWS = 64  # Rows compared when checking a matrix for symmetry
+
+
+def haversine(lat1: np.ndarray, lng1: np.ndarray,
+              lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance between coordinates, broadcasting like numpy
+
+    Args:
+        lat1: Latitudes of the first points in degrees
+        lng1: Longitudes of the first points in degrees
+        lat2: Latitudes of the second points in degrees
+        lng2: Longitudes of the second points in degrees
+
+    Returns:
+        Distances in meters
+    """
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_matrix(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """
+    Build the great-circle distance matrix for a list of stops in one pass
+
+    Args:
+        points: Sequence of (latitude, longitude) pairs in degrees
+
+    Returns:
+        Square matrix of haversine distances in meters
+    """
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    lat = coords[:, 0]
+    lng = coords[:, 1]
+    return haversine(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+
+
+def _nearest_neighbor(distances: np.ndarray, start: int) -> List[int]:
+    """Greedy initial tour, always moving to the closest unvisited stop"""
+    count = len(distances)
+    visited = np.zeros(count, dtype=bool)
+    order = [start]
+    visited[start] = True
+    current = start
+
+    for _ in range(count - 1):
+        row = np.where(visited, np.inf, distances[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        order.append(current)
+
+    return order
+
+
+def _is_symmetric(distances: np.ndarray) -> bool:
+    """
+    Check whether a distance matrix is symmetric from a sample of its rows
+
+    A full comparison of a large matrix with its transpose costs more than
+    the whole planning budget; asymmetric road matrices differ almost
+    everywhere, so a few evenly spaced rows are enough.
+    """
+    rows = np.unique(np.linspace(0, len(distances) - 1, SYMMETRY_SAMPLE_ROWS).astype(np.int64))
+    return np.allclose(distances[rows, :], distances[:, rows].T)
+
+
+def _two_opt_pass(route: np.ndarray, distances: np.ndarray, deadline: float) -> bool:
+    """
+    Apply the best 2-opt move for every edge of the route
+
+    route[0] and route[-1] stay in place. Stops early once the deadline
+    (a time.perf_counter() value) passes. Returns True if the route improved.
+    """
+    improved = False
+    edges = len(route) - 1
+
+    for i in range(edges - 1):
+        if i % DEADLINE_CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+            break
+        a, b = route[i], route[i + 1]
+        c = route[i + 1:edges]
+        e = route[i + 2:edges + 1]
+        # Replacing (a, b) and (c, e) by (a, c) and (b, e) reverses b..c
+        delta = distances[a, c] + distances[b, e] - distances[a, b] - distances[c, e]
+        best = int(np.argmin(delta))
+        if delta[best] < -1e-9:
+            j = i + 1 + best
+            route[i + 1:j + 1] = route[i + 1:j + 1][::-1].copy()
+            improved = True
+
+    return improved
+
+
+def _or_opt_pass(route: np.ndarray, distances: np.ndarray, deadline: float) -> bool:
+    """
+    Move short runs of stops to their cheapest position elsewhere in the route
+
+    Unlike 2-opt this never reverses a run, so it also works for asymmetric
+    (road) distances. Stops early once the deadline passes. Returns True if
+    the route improved.
+    """
+    improved = False
+    steps = 0
+
+    for length in range(1, MAX_SEGMENT_MOVE + 1):
+        i = 1
+        while i + length < len(route):
+            steps += 1
+            if steps % DEADLINE_CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+                return improved
+            p, first = route[i - 1], route[i]
+            last, q = route[i + length - 1], route[i + length]
+            gain = distances[p, first] + distances[last, q] - distances[p, q]
+
+            # Remaining route once the run is cut out, then price every gap
+            rest = np.concatenate((route[:i], route[i + length:]))
+            u, v = rest[:-1], rest[1:]
+            cost = distances[u, first] + distances[last, v] - distances[u, v]
+            cost[i - 1] = np.inf  # Putting it back where it was
+            best = int(np.argmin(cost))
+
+            if cost[best] < gain - 1e-9:
+                segment = route[i:i + length].copy()
+                route[:] = np.concatenate((rest[:best + 1], segment, rest[best + 1:]))
+                improved = True
+            else:
+                i += 1
+
+    return improved
+
+
+def route_length(order: Sequence[int], distances: np.ndarray,
+                 return_to_start: bool = False) -> float:
+    """
+    Get the total length of a tour
+
+    Args:
+        order: Stop indices in visiting order
+        distances: Distance matrix
+        return_to_start: Include the leg from the last stop back to the first
+
+    Returns:
+        Total distance in the matrix's units
+    """
+    order = np.asarray(order, dtype=np.int64)
+    if len(order) < 2:
+        return 0.0
+    total = float(distances[order[:-1], order[1:]].sum())
+    if return_to_start:
+        total += float(distances[order[-1], order[0]])
+    return total
+
+
+def plan_tour(points: Sequence[Tuple[float, float]], distances: Optional[np.ndarray] = None,
+              start: int = 0, return_to_start: bool = False,
+              time_budget: float = 1.0) -> Dict[str, Any]:
+    """
+    Order a list of stops to minimise the total distance travelled
+
+    Builds a nearest-neighbour tour and improves it with 2-opt and or-opt
+    until no move helps or the time budget runs out.
+
+    Args:
+        points: Sequence of (latitude, longitude) stops
+        distances: Optional precomputed matrix, e.g. road distances; great-circle
+                   distances are used if None
+        start: Index of the stop the tour starts from
+        return_to_start: Plan a closed loop back to the starting stop
+        time_budget: Maximum seconds spent ordering the stops, counting both the
+                     nearest-neighbour build and local improvement; the
+                     nearest-neighbour tour is always completed
+
+    Returns:
+        Dictionary with the visiting 'order', the reordered 'points', the
+        length of each leg in 'legs', the total 'distance' and the
+        'initial_distance' of the stops in their original order
+    """
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    count = len(coords)
+    if count and not 0 <= start < count:
+        raise ValueError(f"start index {start} out of range for {count} stops")
+
+    if distances is None:
+        distances = distance_matrix(coords)
+        symmetric = True
+    else:
+        distances = np.asarray(distances, dtype=np.float64)
+        if distances.shape != (count, count):
+            raise ValueError(f"distance matrix must be {count}x{count}, got {distances.shape}")
+        symmetric = count == 0 or _is_symmetric(distances)
+
+    started = time.perf_counter()
+    initial = list(range(count))
+    initial_distance = route_length(initial, distances, return_to_start)
+
+    if count == 0:
+        order = []
+    elif count < 3:
+        order = [start] + [stop for stop in initial if stop != start]
+    else:
+        order = _nearest_neighbor(distances, start)
+
+        # Close the loop with the start stop, or end an open path at a free
+        # dummy stop, so both are optimised as routes with fixed endpoints
+        if return_to_start:
+            matrix = distances
+            end = start
+        else:
+            matrix = np.zeros((count + 1, count + 1))
+            matrix[:count, :count] = distances
+            end = count
+        route = np.array(order + [end], dtype=np.int64)
+
+        passes = 0
+        deadline = started + time_budget
+        while time.perf_counter() < deadline:
+            passes += 1
+            improved = symmetric and _two_opt_pass(route, matrix, deadline)
+            if time.perf_counter() >= deadline:
+                break
+            improved = _or_opt_pass(route, matrix, deadline) or improved
+            if not improved:
+                break
+
+        order = [int(stop) for stop in route[:-1]]
+        logger.info(f"Planned {count}-stop tour in {time.perf_counter() - started:.2f}s "
+                    f"({passes} improvement passes)")
+
+    order_array = np.asarray(order, dtype=np.int64)
+    legs = distances[order_array[:-1], order_array[1:]] if count > 1 else np.zeros(0)
+    if return_to_start and count > 1:
+        legs = np.append(legs, distances[order_array[-1], order_array[0]])
+
+    return {
+        'order': order,
+        'points': coords[order_array].tolist() if count else [],
+        'legs': legs.tolist(),
+        'distance': float(legs.sum()),
+        'initial_distance': initial_distance
+    }
+
+
+def build_trajectory(points: Sequence[Tuple[float, float]], speed: float,
+                     interval: float = 1.0, return_to_start: bool = False) -> List[List[float]]:
+    """
+    Sample a tour at a fixed time interval for playback
+
+    Args:
+        points: Stops in visiting order, e.g. plan_tour(...)['points']
+        speed: Travel speed in meters per second
+        interval: Seconds between samples
+        return_to_start: Travel back to the first stop at the end
+
+    Returns:
+        List of [latitude, longitude, seconds since start] samples
+    """
+    if speed <= 0 or interval <= 0:
+        raise ValueError("speed and interval must be positive")
+
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if return_to_start and len(coords) > 1:
+        coords = np.vstack((coords, coords[:1]))
+    if len(coords) < 2:
+        return [[float(lat), float(lng), 0.0] for lat, lng in coords]
+
+    legs = haversine(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+    arrival = np.concatenate(([0.0], np.cumsum(legs))) / speed
+    times = np.arange(0.0, arrival[-1], interval)
+    times = np.append(times, arrival[-1])
+
+    # Short legs make linear interpolation in degrees indistinguishable from
+    # the great circle, as long as legs crossing the antimeridian are unwrapped
+    # first and the results wrapped back into [-180, 180)
+    unwrapped = np.degrees(np.unwrap(np.radians(coords[:, 1])))
+    latitudes = np.interp(times, arrival, coords[:, 0])
+    longitudes = (np.interp(times, arrival, unwrapped) + 180.0) % 360.0 - 180.0
+    return np.column_stack((latitudes, longitudes, times)).tolist()
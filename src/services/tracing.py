@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Low-overhead tracing for the Location Spoofer send path
+Records structured events into a preallocated ring buffer and formats them
+on a background thread so logging never blocks the event loop
+"""
+
+import itertools
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("send-trace")
+
+DEFAULT_CAPACITY = 4096
+DEFAULT_FLUSH_INTERVAL = 0.5  # seconds
+
+
+class SendTracer:
+    """
+    Ring buffer of structured send-path events
+
+    The hot path only takes a timestamp and stores one tuple into a
+    preallocated slot. A daemon thread drains new events to the
+    "send-trace" logger, and the buffer can be dumped on demand.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, sample_every: int = 1,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 log_level: int = logging.INFO, start: bool = True):
+        """
+        Initialize the tracer
+
+        Args:
+            capacity: Number of events kept in the ring buffer
+            sample_every: Record only every Nth regular event (errors are always recorded)
+            flush_interval: Seconds between background writer passes
+            log_level: Level the background writer logs events at; events below the
+                       "send-trace" logger's level are only kept for dump()
+            start: Start the background writer immediately
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.log_level = log_level
+        self.enabled = True
+        self.dropped = 0
+
+        self._slots: List[Optional[tuple]] = [None] * capacity
+        self._sequence = itertools.count()
+        self._sample_counter = itertools.count()
+        self._head = 0  # Next sequence number to be written
+        self._written = 0  # Next sequence number the writer will emit
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Serializes writers, since a closing thread may still be finishing
+        # its last pass when a new one starts
+        self._write_lock = threading.Lock()
+
+        self.set_sampling(sample_every)
+        if start:
+            self.start()
+
+    def set_sampling(self, sample_every: int):
+        """
+        Change how many regular events are recorded
+
+        Args:
+            sample_every: Record every Nth event; 1 records everything
+        """
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        self.sample_every = sample_every
+
+    def record(self, event: str, ok: bool = True, duration_ns: int = 0,
+               data: Any = None, force: bool = False):
+        """
+        Record an event without formatting or I/O
+
+        Args:
+            event: Short event name, e.g. "send" or "connect"
+            ok: Whether the traced operation succeeded
+            duration_ns: Duration of the traced operation in nanoseconds
+            data: Small payload kept as-is until it is written or dumped
+            force: Bypass sampling (failures are always forced)
+        """
+        if not self.enabled:
+            return
+        if (ok and not force and self.sample_every > 1
+                and next(self._sample_counter) % self.sample_every):
+            return
+
+        # itertools.count is atomic under the GIL, so concurrent writers
+        # never share a slot
+        sequence = next(self._sequence)
+        self._slots[sequence % self.capacity] = (
+            sequence, time.time_ns(), event, ok, duration_ns, data
+        )
+        self._head = sequence + 1
+
+    def start(self):
+        """Start the background writer thread if it is not running"""
+        if self._thread and self._thread.is_alive():
+            return
+        # Each writer gets its own stop event so restarting never revives
+        # a thread that is shutting down
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stopped,), name="send-trace-writer", daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop the background writer after emitting pending events
+
+        Args:
+            timeout: Seconds to wait for the writer thread to exit; on timeout
+                     it keeps flushing in the background and exits on its own
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Trace writer still flushing after close timeout")
+            self._thread = None
+        else:
+            # No writer running; emit anything recorded since it last stopped
+            self._write_pending()
+
+    def flush(self):
+        """Ask the background writer to emit pending events now"""
+        self._wakeup.set()
+
+    def _run(self, stopped: threading.Event):
+        """Background writer loop"""
+        while not stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._write_pending()
+        self._write_pending()
+
+    def _write_pending(self):
+        """Emit every event recorded since the last pass"""
+        with self._write_lock:
+            self._write_pending_locked()
+
+    def _write_pending_locked(self):
+        head = self._head
+        if head - self._written > self.capacity:
+            # The hot path lapped the writer; skip what was overwritten
+            self.dropped += head - self._written - self.capacity
+            self._written = head - self.capacity
+
+        if not logger.isEnabledFor(self.log_level):
+            self._written = head
+            return
+
+        for sequence in range(self._written, head):
+            entry = self._slots[sequence % self.capacity]
+            if entry is None or entry[0] != sequence:
+                # Overwritten (or not yet stored) while we were catching up
+                self.dropped += 1
+                continue
+            logger.log(self.log_level, self._format(entry))
+        self._written = head
+
+    @staticmethod
+    def _format(entry: tuple) -> str:
+        sequence, timestamp_ns, event, ok, duration_ns, data = entry
+        status = "ok" if ok else "error"
+        message = f"#{sequence} {event} {status} {duration_ns / 1000:.1f}us"
+        if data is not None:
+            message += f" {data}"
+        return message
+
+    def events(self) -> List[Dict[str, Any]]:
+        """
+        Get a snapshot of the buffered events, oldest first
+
+        Returns:
+            List of event dictionaries
+        """
+        entries = [entry for entry in list(self._slots) if entry is not None]
+        entries.sort(key=lambda entry: entry[0])
+        return [
+            {
+                'sequence': sequence,
+                'timestamp': timestamp_ns / 1e9,
+                'event': event,
+                'ok': ok,
+                'duration_us': duration_ns / 1000,
+                'data': data
+            }
+            for sequence, timestamp_ns, event, ok, duration_ns, data in entries
+        ]
+
+    def dump(self, path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Dump the buffered events, optionally to a JSON lines file
+
+        Args:
+            path: File to write one JSON event per line to
+
+        Returns:
+            List of event dictionaries, oldest first
+        """
+        events = self.events()
+        if path:
+            with open(path, 'w', encoding='utf-8') as output:
+                for event in events:
+                    output.write(json.dumps(event, default=str) + "\n")
+            logger.info(f"Dumped {len(events)} trace events to {path}")
+        return events
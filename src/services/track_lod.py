@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Level-of-detail service for the Location Spoofer
+Builds a multi-resolution simplification pyramid for large routes and tracks
+so the map only has to draw the points visible at the current zoom and viewport
+"""
+
+import logging
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("track-lod")
+
+# Leaflet/OpenStreetMap tile geometry
+TILE_SIZE = 256
+MAX_ZOOM = 19
+MAX_MERCATOR_LAT = 85.05112878
+
+Bounds = Tuple[float, float, float, float]  # (south, west, north, east)
+
+# Per-level segment index: (track indices, first/last level position of each
+# segment, sorted tile keys and order of single-tile segments, ids, tile
+# bounding boxes and antimeridian flags of segments spanning several tiles)
+Level = Tuple[np.ndarray, ...]
+
+
+def project(latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Project coordinates to normalized Web Mercator space
+
+    Args:
+        latitudes: Array of latitudes in degrees
+        longitudes: Array of longitudes in degrees
+
+    Returns:
+        Tuple of (x, y) arrays in [0, 1], with y growing southwards like map tiles
+    """
+    lat = np.radians(np.clip(latitudes, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(longitudes, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+    return x, y
+
+
+def _significance(x: np.ndarray, y: np.ndarray, min_tolerance: float) -> np.ndarray:
+    """
+    Compute the Douglas-Peucker significance of every point
+
+    The significance of a point is the largest tolerance at which the
+    simplification still keeps it, so any level of the pyramid is a simple
+    threshold over this array. Segments whose deviation is already below
+    min_tolerance are not subdivided further; their interior points only
+    appear at full resolution.
+
+    Args:
+        x: Projected x coordinates
+        y: Projected y coordinates
+        min_tolerance: Finest tolerance that needs an exact ordering
+
+    Returns:
+        Array of significance values (endpoints are infinite)
+    """
+    count = len(x)
+    significance = np.zeros(count, dtype=np.float64)
+    if count == 0:
+        return significance
+    significance[0] = significance[-1] = np.inf
+
+    # Subdivide breadth-first, handling every open segment in one vectorized
+    # pass per round instead of one small numpy call per segment
+    starts = np.array([0], dtype=np.int64)
+    ends = np.array([count - 1], dtype=np.int64)
+    parents = np.array([np.inf])
+
+    while len(starts):
+        lengths = ends - starts - 1
+        open_segments = lengths > 0
+        starts, ends = starts[open_segments], ends[open_segments]
+        parents, lengths = parents[open_segments], lengths[open_segments]
+        if not len(starts):
+            break
+
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        points = np.arange(int(lengths.sum())) - offsets[segment] + starts[segment] + 1
+
+        first, last = starts[segment], ends[segment]
+        dx = x[last] - x[first]
+        dy = y[last] - y[first]
+        px = x[points] - x[first]
+        py = y[points] - y[first]
+        length_sq = dx * dx + dy * dy
+
+        # Distance to the segment, clamped to its endpoints
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(length_sq > 0.0, (px * dx + py * dy) / length_sq, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        distances = np.hypot(px - t * dx, py - t * dy)
+
+        # First point reaching each segment's maximum deviation
+        deviation = np.maximum.reduceat(distances, offsets)
+        hits = np.flatnonzero(distances == deviation[segment])
+        _, first_hit = np.unique(segment[hits], return_index=True)
+        splits = points[hits[first_hit]]
+
+        keep = deviation >= min_tolerance
+        splits, deviation, parents = splits[keep], deviation[keep], parents[keep]
+
+        # Clamp to the parent so coarser levels are always subsets of finer ones
+        values = np.minimum(deviation, parents)
+        significance[splits] = values
+
+        starts, ends = (np.concatenate((starts[keep], splits)),
+                        np.concatenate((splits, ends[keep])))
+        parents = np.concatenate((values, values))
+
+    return significance
+
+
+class TrackPyramid:
+    """
+    Multi-resolution view of a route or recorded track
+
+    Points are simplified once with Douglas-Peucker in Web Mercator space.
+    Each zoom level keeps the points whose deviation is at least
+    pixel_tolerance screen pixels at that zoom. Levels are indexed by segment,
+    so a line crossing a tile is found even with no vertex inside it, and are
+    queried per map tile with an LRU cache of recently served tiles.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]], pixel_tolerance: float = 1.0,
+                 max_zoom: int = MAX_ZOOM, cache_size: int = 512):
+        """
+        Build the simplification pyramid for a track
+
+        Args:
+            points: Sequence of (latitude, longitude) pairs in track order
+            pixel_tolerance: Maximum on-screen deviation in pixels at any zoom
+            max_zoom: Deepest zoom level; queries beyond it use full resolution
+            cache_size: Number of tiles kept in the tile cache
+        """
+        if pixel_tolerance <= 0:
+            raise ValueError("pixel_tolerance must be positive")
+        if not 0 <= max_zoom <= 30:
+            raise ValueError("max_zoom must be between 0 and 30")
+
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.latitudes = coords[:, 0]
+        self.longitudes = coords[:, 1]
+        self.pixel_tolerance = pixel_tolerance
+        self.max_zoom = max_zoom
+        self.cache_size = cache_size
+
+        self.x, self.y = project(self.latitudes, self.longitudes)
+        self.significance = _significance(self.x, self.y, self._tolerance(max_zoom))
+
+        self._levels: Dict[int, Level] = {}
+        self._tiles: "OrderedDict[Tuple[int, int, int], np.ndarray]" = OrderedDict()
+
+        logger.info(f"Built track pyramid for {len(self)} points "
+                    f"({len(self.level_indices(0))} at zoom 0)")
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def _tolerance(self, zoom: int) -> float:
+        """Deviation in normalized Mercator units that is invisible at a zoom"""
+        return self.pixel_tolerance / (TILE_SIZE * (1 << zoom))
+
+    def _clamp_zoom(self, zoom: float) -> int:
+        return max(0, min(int(math.floor(zoom)), self.max_zoom + 1))
+
+    def level_indices(self, zoom: float) -> np.ndarray:
+        """
+        Get the track indices kept at a zoom level
+
+        Args:
+            zoom: Map zoom level
+
+        Returns:
+            Sorted array of indices into the original track
+        """
+        return self._level(self._clamp_zoom(zoom))[0]
+
+    def _level(self, zoom: int) -> Level:
+        """
+        Get the segment index for a clamped zoom level
+
+        Segments with both ends in one tile are looked up by tile key; the
+        (usually few) segments spanning several tiles are matched by their
+        bounding box. Levels are built lazily since most sessions only visit
+        a few zooms.
+        """
+        level = self._levels.get(zoom)
+        if level is not None:
+            return level
+
+        if zoom > self.max_zoom:
+            indices = np.arange(len(self))
+        else:
+            indices = np.flatnonzero(self.significance >= self._tolerance(zoom))
+
+        scale = 1 << zoom
+        tile_x = np.clip((self.x[indices] * scale).astype(np.int64), 0, scale - 1)
+        tile_y = np.clip((self.y[indices] * scale).astype(np.int64), 0, scale - 1)
+
+        # A lone point is drawn as a zero-length segment
+        positions = np.arange(len(indices))
+        first = positions[:-1] if len(indices) > 1 else positions
+        last = positions[1:] if len(indices) > 1 else positions
+
+        x0 = np.minimum(tile_x[first], tile_x[last])
+        x1 = np.maximum(tile_x[first], tile_x[last])
+        y0 = np.minimum(tile_y[first], tile_y[last])
+        y1 = np.maximum(tile_y[first], tile_y[last])
+        single = (x0 == x1) & (y0 == y1)
+        # Segments jumping more than half the world cross the antimeridian and
+        # cover the columns outside [x0, x1] instead
+        wraps = np.abs(self.x[indices[last]] - self.x[indices[first]]) > 0.5
+
+        local = np.flatnonzero(single)
+        keys = x0[local] * scale + y0[local]
+        order = np.argsort(keys, kind="stable")
+        spanning = np.flatnonzero(~single)
+
+        level = (indices, first, last, keys[order], local[order], spanning,
+                 x0[spanning], x1[spanning], y0[spanning], y1[spanning], wraps[spanning])
+        self._levels[zoom] = level
+        return level
+
+    def tile(self, zoom: float, tile_x: int, tile_y: int) -> np.ndarray:
+        """
+        Get the level positions needed to draw one map tile
+
+        The result holds both ends of every segment that may cross the tile,
+        so lines entering, leaving or passing through it are drawn too.
+
+        Args:
+            zoom: Map zoom level
+            tile_x: Tile column
+            tile_y: Tile row
+
+        Returns:
+            Sorted array of positions into level_indices(zoom)
+        """
+        zoom = self._clamp_zoom(zoom)
+        key = (zoom, tile_x, tile_y)
+        cached = self._tiles.get(key)
+        if cached is not None:
+            self._tiles.move_to_end(key)
+            return cached
+
+        (_, first, last, keys, local, spanning,
+         x0, x1, y0, y1, wraps) = self._level(zoom)
+        tile_key = tile_x * (1 << zoom) + tile_y
+        lo, hi = np.searchsorted(keys, [tile_key, tile_key + 1])
+        in_columns = np.where(wraps, (tile_x <= x0) | (x1 <= tile_x),
+                              (x0 <= tile_x) & (tile_x <= x1))
+        crossing = spanning[in_columns & (y0 <= tile_y) & (tile_y <= y1)]
+        segments = np.concatenate((local[lo:hi], crossing))
+
+        positions = np.unique(np.concatenate((first[segments], last[segments])))
+
+        self._tiles[key] = positions
+        if len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+        return positions
+
+    def visible_points(self, bounds: Bounds, zoom: float,
+                       upto: Optional[int] = None) -> List[List[List[float]]]:
+        """
+        Get the simplified polylines visible in a map viewport
+
+        Longitudes are unwrapped along each polyline, so lines crossing the
+        antimeridian continue past +/-180 the way Leaflet expects.
+
+        Args:
+            bounds: Viewport as (south, west, north, east) in degrees
+            zoom: Map zoom level
+            upto: Optional track index to stop at, for drawing live progress
+
+        Returns:
+            List of polylines, each a list of [latitude, longitude] pairs,
+            ready to be passed to L.polyline
+        """
+        zoom = self._clamp_zoom(zoom)
+        indices = self._level(zoom)[0]
+        if len(indices) == 0:
+            return []
+
+        south, west, north, east = bounds
+        scale = 1 << zoom
+        if east - west >= 360.0:
+            x_range = range(scale)
+        else:
+            # Viewports crossing the antimeridian have west > east; measure
+            # eastwards from west and wrap the tile columns around the world
+            min_x = ((west + 180.0) % 360.0) / 360.0
+            span = ((east - west) % 360.0) / 360.0
+            columns = range(int(min_x * scale), int((min_x + span) * scale) + 1)
+            x_range = sorted({column % scale for column in columns})
+        max_y, min_y = project(np.array([south, north]), np.zeros(2))[1]
+        y_range = range(max(0, int(min_y * scale)), min(scale - 1, int(max_y * scale)) + 1)
+
+        tiles = [self.tile(zoom, tx, ty) for tx in x_range for ty in y_range]
+        if not tiles:
+            return []
+        positions = np.unique(np.concatenate(tiles))
+
+        tail = None
+        if upto is not None:
+            kept = indices[positions] <= upto
+            last = positions[kept][-1] if kept.any() else -1
+            # The current position is rarely a kept point; end the line exactly on it
+            if last + 1 in positions and indices[last + 1] > upto and 0 <= upto < len(self):
+                tail = upto
+            positions = positions[kept]
+        if len(positions) == 0:
+            return []
+
+        # Split wherever a level point is skipped, so each run is a continuous line
+        breaks = np.flatnonzero(np.diff(positions) > 1) + 1
+        runs = [indices[run] for run in np.split(positions, breaks)]
+        if tail is not None and runs[-1][-1] != tail:
+            runs[-1] = np.append(runs[-1], tail)
+
+        polylines = []
+        for track in runs:
+            longitudes = np.degrees(np.unwrap(np.radians(self.longitudes[track])))
+            polylines.append(np.column_stack((self.latitudes[track], longitudes)).tolist())
+        return polylines
+
+    def clear_cache(self):
+        """Drop all cached tiles and levels"""
+        self._tiles.clear()
+        self._levels.clear()
+
+
+def test_track_pyramid():
+    """Test viewport queries on the track pyramid"""
+    # A segment crossing the viewport with no vertex inside it is still drawn
+    pyramid = TrackPyramid([(0.0, -10.0), (0.0, 10.0)])
+    assert pyramid.visible_points((-1, -1, 1, 1), 10) == [[[0.0, -10.0], [0.0, 10.0]]]
+    assert pyramid.visible_points((-1, -1, 1, 1), 10, upto=0) == [[[0.0, -10.0]]]
+
+    # Lines across the antimeridian are unwrapped instead of spanning the world
+    pyramid = TrackPyramid([(0.0, 179.0), (1.0, -179.0)])
+    assert pyramid.visible_points((-2, 178, 2, -178), 8) == [[[0.0, 179.0], [1.0, 181.0]]]
+    assert pyramid.visible_points((-2, -10, 2, 10), 8) == []
+
+    print("Track pyramid checks passed")
+
+if __name__ == "__main__":
+    # Run the test function if this script is executed directly
+    test_track_pyramid()